@@ -1,19 +1,53 @@
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import FastAPI, Request, HTTPException, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+import asyncio
 import httpx
+import ipaddress
 import logging
+import orjson
+from collections import deque
 from datetime import datetime
 import os
 import re
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode, urlsplit
 
-logging.basicConfig(level=logging.INFO)
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING"))
 logger = logging.getLogger(__name__)
 
+# Shared upstream HTTP client with a keep-alive connection pool, created in
+# the lifespan below so TCP/TLS handshakes aren't paid on every request
+client: httpx.AsyncClient | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(connect=3.0, read=15.0, write=10.0, pool=5.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        http2=True
+    )
+    try:
+        yield
+    finally:
+        await client.aclose()
+        client = None
+
 app = FastAPI(
     title="CyberOrion TikTok Downloader API",
     version="4.0",
-    description="Download TikTok videos without watermark - No cookies required"
+    description="Download TikTok videos without watermark - No cookies required",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -41,196 +75,409 @@ app.add_middleware(
 TIKWM_API = "https://www.tikwm.com/api/"
 TIKMATE_API = "https://tikmate.app/api/lookup"
 
+# Single-pass TikTok video ID matcher; the alternation keeps the original
+# pattern priority since regex alternatives match left to right
+_VIDEO_ID_RE = re.compile(r'(?:/@[\w.-]+/video/|/v/|video/|/)(\d+)', re.IGNORECASE)
+
+# Download link inside SnapSave's HTML response, compiled once at import
+_SNAPSAVE_HREF_RE = re.compile(r'href="([^"]+)"[^>]*>Download')
+
+# Constant upstream request headers, built once instead of per call
+_TIKWM_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip"
+}
+_SNAPSAVE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Accept": "*/*"
+}
+
+# Matches tiktok.com (any subdomain) anchored to the URL host position
+_TIKTOK_HOST_RE = re.compile(r'https?://(?:[\w-]+\.)*tiktok\.com/', re.IGNORECASE)
+
+# Known TikTok hosts - O(1) set lookup covers the normal case without regex
+_ALLOWED_HOSTS = frozenset([
+    'tiktok.com',
+    'www.tiktok.com',
+    'vm.tiktok.com',
+    'vt.tiktok.com',
+    'm.tiktok.com'
+])
+
+
+def is_tiktok_url(url: str) -> bool:
+    """Check that a URL points at a known TikTok host"""
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        host = None
+
+    if host is not None:
+        return host.lower() in _ALLOWED_HOSTS
+
+    # Malformed input - fall back to the regex check
+    return bool(_TIKTOK_HOST_RE.match(url))
+
 class RateLimiter:
     """Simple rate limiter"""
     def __init__(self, max_requests=10, time_window=60):
         self.max_requests = max_requests
         self.time_window = time_window
         self.requests = {}
-    
-    def check_rate_limit(self, ip: str):
-        import time
-        now = time.time()
-        
-        if ip not in self.requests:
-            self.requests[ip] = []
-        
-        # Remove old requests
-        self.requests[ip] = [r for r in self.requests[ip] if now - r < self.time_window]
-        
-        if len(self.requests[ip]) >= self.max_requests:
-            wait_time = self.time_window - (now - self.requests[ip][0])
-            raise HTTPException(
-                status_code=429,
-                detail={
-                    "error": "Too many requests",
-                    "message": f"Please wait {int(wait_time)} seconds",
-                    "retry_after": int(wait_time)
-                }
-            )
-        
-        self.requests[ip].append(now)
+        self._lock = asyncio.Lock()
+        # Sweep idle IP buckets every N checks so the dict can't grow unbounded
+        self._checks_until_sweep = self._sweep_every = 1000
+
+    async def check_rate_limit(self, ip: str):
+        # Monotonic clock - immune to wall-clock jumps
+        now = time.monotonic()
+        cutoff = now - self.time_window
+
+        # Guard the check-then-append sequence so concurrent coroutines
+        # can't interleave and slip past the limit
+        async with self._lock:
+            timestamps = self.requests.setdefault(ip, deque())
+
+            # Drop expired requests from the head - O(1) per expiry, no reallocation
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+            if len(timestamps) >= self.max_requests:
+                wait_time = self.time_window - (now - timestamps[0])
+                raise HTTPException(
+                    status_code=429,
+                    detail={
+                        "error": "Too many requests",
+                        "message": f"Please wait {int(wait_time)} seconds",
+                        "retry_after": int(wait_time)
+                    }
+                )
+
+            timestamps.append(now)
+
+            self._checks_until_sweep -= 1
+            if self._checks_until_sweep <= 0:
+                self._checks_until_sweep = self._sweep_every
+                self._sweep(now)
+
+    def _sweep(self, now: float):
+        """Evict buckets for IPs that have gone quiet"""
+        stale_cutoff = now - self.time_window * 10
+        stale = [
+            ip for ip, timestamps in self.requests.items()
+            if not timestamps or timestamps[-1] < stale_cutoff
+        ]
+        for ip in stale:
+            del self.requests[ip]
 
 rate_limiter = RateLimiter(max_requests=10, time_window=60)
 
+# Cap simultaneous upstream resolutions at a known-good ceiling
+_DL_SEM = asyncio.Semaphore(int(os.environ.get("MAX_CONCURRENT_DL", "3")))
+
+# In-flight resolutions, keyed by video ID - concurrent requests for the
+# same video await the first caller's future instead of re-resolving
+_inflight = {}
+_inflight_lock = asyncio.Lock()
+
+# Successful resolutions keyed by video ID, so reloads and re-shares of the
+# same video skip the upstream call entirely for the TTL window
+_CACHE_TTL = 600
+_CACHE_MAX = 10_000
+_resolve_cache = {}
+
+
+def _canonical_url(url: str) -> str:
+    """Normalize a TikTok URL so equivalent links share one resolution"""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    return host + parts.path.rstrip("/")
+
+# Timestamp served by / and /health, re-formatted at most once per second;
+# a lazy memo needs no background task and never runs when nobody probes
+_ts_cache = ["", 0]
+
+
+def _cached_timestamp() -> str:
+    t = int(time.time())
+    if t != _ts_cache[1]:
+        _ts_cache[0] = datetime.now().isoformat()
+        _ts_cache[1] = t
+    return _ts_cache[0]
+
+# Transient network failures worth one retry; anything else propagates
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError)
+
+
+async def _post_with_retry(url: str, content: bytes, headers: dict, attempts: int = 2):
+    """POST via the shared client, retrying transient errors with backoff"""
+    for attempt in range(attempts):
+        try:
+            return await client.post(url, content=content, headers=headers)
+        except _RETRYABLE_ERRORS:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(0.2 * 2 ** attempt)
+
+def get_client_ip(request: Request) -> str:
+    """Real client IP - behind Render's proxy request.client.host is the proxy"""
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        candidate = forwarded.split(",", 1)[0].strip()
+        try:
+            ipaddress.ip_address(candidate)
+            return candidate
+        except ValueError:
+            pass
+
+    return request.client.host
+
 def extract_video_id(url: str) -> str:
     """Extract video ID from TikTok URL"""
-    patterns = [
-        r'/@[\w.-]+/video/(\d+)',
-        r'/v/(\d+)',
-        r'video/(\d+)',
-        r'/(\d+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    
-    return None
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+def extract_snapsave_link(html: str) -> str:
+    """Pull the download link out of SnapSave's HTML response"""
+    # Prefer a real DOM walk (C-backed) over grepping markup with a regex
+    if HTMLParser is not None:
+        try:
+            for node in HTMLParser(html).css("a[href]"):
+                if "Download" in (node.text() or ""):
+                    return node.attributes.get("href")
+        except Exception:
+            pass
+
+    match = _SNAPSAVE_HREF_RE.search(html)
+    return match.group(1) if match else None
 
 async def download_with_tikwm(url: str) -> dict:
     """Download using TikWM API (Primary method)"""
     try:
-        logger.info(f"🔄 Trying TikWM API for: {url}")
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                TIKWM_API,
-                data={
-                    "url": url,
-                    "hd": "1"
-                },
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    "Accept": "application/json"
+        logger.debug("Trying TikWM API for: %s", url)
+
+        response = await _post_with_retry(
+            TIKWM_API,
+            content=urlencode({"url": url, "hd": "1"}).encode(),
+            headers=_TIKWM_HEADERS
+        )
+
+        logger.debug("TikWM response status: %s", response.status_code)
+
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            if data.get("code") == 0:
+                video_data = data.get("data", {})
+
+                # Get video URL (try HD first, fallback to SD)
+                video_url = video_data.get("hdplay") or video_data.get("play")
+
+                if not video_url:
+                    logger.error("No video URL found in response")
+                    return {"success": False, "error": "No video URL in response"}
+
+                logger.debug("TikWM success, video URL: %.50s...", video_url)
+
+                return {
+                    "success": True,
+                    "download_url": video_url,
+                    "title": video_data.get("title", "TikTok Video"),
+                    "author": video_data.get("author", {}).get("unique_id", "Unknown"),
+                    "caption": video_data.get("title", ""),
+                    "thumbnail": video_data.get("cover", ""),
+                    "duration": video_data.get("duration", 0),
+                    "plays": video_data.get("play_count", 0),
+                    "likes": video_data.get("digg_count", 0),
+                    "comments": video_data.get("comment_count", 0),
+                    "shares": video_data.get("share_count", 0),
+                    "api_source": "TikWM"
                 }
-            )
-            
-            logger.info(f"TikWM response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"TikWM response data: {data}")
-                
-                if data.get("code") == 0:
-                    video_data = data.get("data", {})
-                    
-                    # Get video URL (try HD first, fallback to SD)
-                    video_url = video_data.get("hdplay") or video_data.get("play")
-                    
-                    if not video_url:
-                        logger.error("No video URL found in response")
-                        return {"success": False, "error": "No video URL in response"}
-                    
-                    logger.info(f"✅ TikWM Success! Video URL: {video_url[:50]}...")
-                    
-                    return {
-                        "success": True,
-                        "download_url": video_url,
-                        "title": video_data.get("title", "TikTok Video"),
-                        "author": video_data.get("author", {}).get("unique_id", "Unknown"),
-                        "caption": video_data.get("title", ""),
-                        "thumbnail": video_data.get("cover", ""),
-                        "duration": video_data.get("duration", 0),
-                        "plays": video_data.get("play_count", 0),
-                        "likes": video_data.get("digg_count", 0),
-                        "comments": video_data.get("comment_count", 0),
-                        "shares": video_data.get("share_count", 0),
-                        "api_source": "TikWM"
-                    }
-                else:
-                    error_msg = data.get("msg", "Unknown error")
-                    logger.error(f"TikWM API error: {error_msg}")
-                    return {"success": False, "error": f"TikWM: {error_msg}"}
             else:
-                logger.error(f"TikWM status code: {response.status_code}")
-                return {"success": False, "error": f"TikWM returned {response.status_code}"}
-                
+                error_msg = data.get("msg", "Unknown error")
+                logger.error("TikWM API error: %s", error_msg)
+                return {"success": False, "error": f"TikWM: {error_msg}"}
+        else:
+            logger.error("TikWM status code: %s", response.status_code)
+            return {"success": False, "error": f"TikWM returned {response.status_code}"}
+
     except httpx.TimeoutException:
         logger.error("TikWM timeout")
         return {"success": False, "error": "TikWM API timeout"}
     except Exception as e:
-        logger.error(f"TikWM exception: {str(e)}")
+        logger.error("TikWM exception: %s", e)
         return {"success": False, "error": f"TikWM error: {str(e)}"}
 
 async def download_with_snapsave(url: str) -> dict:
     """Download using SnapSave API (Fallback method)"""
     try:
-        logger.info(f"🔄 Trying SnapSave API for: {url}")
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # SnapSave requires a two-step process
-            response = await client.post(
-                "https://snapsave.app/action.php?lang=en",
-                data={
-                    "url": url
-                },
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    "Content-Type": "application/x-www-form-urlencoded",
-                    "Accept": "*/*"
+        logger.debug("Trying SnapSave API for: %s", url)
+
+        # SnapSave requires a two-step process
+        response = await _post_with_retry(
+            "https://snapsave.app/action.php?lang=en",
+            content=urlencode({"url": url}).encode(),
+            headers=_SNAPSAVE_HEADERS
+        )
+
+        if response.status_code == 200:
+            # Parse HTML response to extract download URL
+            download_url = extract_snapsave_link(response.text)
+
+            if download_url:
+                logger.debug("SnapSave success")
+
+                return {
+                    "success": True,
+                    "download_url": download_url,
+                    "title": "TikTok Video",
+                    "author": "Unknown",
+                    "caption": "",
+                    "thumbnail": "",
+                    "api_source": "SnapSave"
                 }
-            )
-            
-            if response.status_code == 200:
-                # Parse HTML response to extract download URL
-                html = response.text
-                
-                # Look for download URL in HTML
-                import re
-                url_pattern = r'href="([^"]+)"[^>]*>Download'
-                match = re.search(url_pattern, html)
-                
-                if match:
-                    download_url = match.group(1)
-                    logger.info(f"✅ SnapSave Success!")
-                    
-                    return {
-                        "success": True,
-                        "download_url": download_url,
-                        "title": "TikTok Video",
-                        "author": "Unknown",
-                        "caption": "",
-                        "thumbnail": "",
-                        "api_source": "SnapSave"
-                    }
-                else:
-                    return {"success": False, "error": "Could not parse SnapSave response"}
             else:
-                return {"success": False, "error": f"SnapSave returned {response.status_code}"}
-                
+                return {"success": False, "error": "Could not parse SnapSave response"}
+        else:
+            return {"success": False, "error": f"SnapSave returned {response.status_code}"}
+
     except Exception as e:
-        logger.error(f"SnapSave exception: {str(e)}")
+        logger.error("SnapSave exception: %s", e)
         return {"success": False, "error": f"SnapSave error: {str(e)}"}
 
+# How long TikWM gets to itself before the SnapSave hedge fires
+_HEDGE_DELAY = 2.0
+
+
+async def _snapsave_hedge(url: str, primary_failed: asyncio.Event) -> dict:
+    """Delayed SnapSave entry for the hedged race below"""
+    # Hold for the hedge delay, but start right away if TikWM has
+    # already come back unsuccessful
+    try:
+        await asyncio.wait_for(primary_failed.wait(), timeout=_HEDGE_DELAY)
+    except asyncio.TimeoutError:
+        pass
+    return await download_with_snapsave(url)
+
+
+async def _race_downloaders(tiktok_url: str) -> dict:
+    """Race TikWM against a delayed SnapSave hedge, first success wins"""
+    primary_failed = asyncio.Event()
+    primary = asyncio.create_task(download_with_tikwm(tiktok_url))
+    pending = {
+        primary,
+        asyncio.create_task(_snapsave_hedge(tiktok_url, primary_failed))
+    }
+    winner = None
+    failure = None
+
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                outcome = task.result()
+                if outcome.get("success"):
+                    winner = outcome
+                    break
+                failure = outcome
+                if task is primary:
+                    # Release the hedge instead of waiting out its delay
+                    primary_failed.set()
+    finally:
+        # Cancel the loser (or both on error) so it stops hitting upstream
+        for task in pending:
+            task.cancel()
+
+    return winner or failure or {"success": False, "error": "All download methods failed"}
+
+
+async def resolve_video(tiktok_url: str) -> dict:
+    """Resolve a TikTok URL, coalescing concurrent requests for the same video"""
+    # Key by video ID so the same video reached via vm./vt. short links or
+    # different query params shares one cache entry and one upstream call;
+    # fall back to the canonical URL when no ID can be extracted
+    key = extract_video_id(tiktok_url) or _canonical_url(tiktok_url)
+    now = time.monotonic()
+
+    async with _inflight_lock:
+        cached = _resolve_cache.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                return cached[1]
+            del _resolve_cache[key]
+
+        existing = _inflight.get(key)
+        if existing is None:
+            future = asyncio.get_running_loop().create_future()
+            _inflight[key] = future
+
+    if existing is not None:
+        return await existing
+
+    try:
+        async with _DL_SEM:
+            result = await _race_downloaders(tiktok_url)
+
+        if result.get("success"):
+            async with _inflight_lock:
+                # FIFO-evict when full; dicts preserve insertion order
+                while len(_resolve_cache) >= _CACHE_MAX:
+                    del _resolve_cache[next(iter(_resolve_cache))]
+                _resolve_cache[key] = (time.monotonic() + _CACHE_TTL, result)
+
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        # Cancellation bypasses the except clause above; resolve the future
+        # regardless so coalesced waiters fail fast instead of hanging
+        if not future.done():
+            future.cancel()
+        async with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+# The / payload never changes except for its timestamp, so it is serialized
+# once at import and the timestamp is spliced into the pre-built bytes
+_ROOT_PREFIX = orjson.dumps({
+    "status": "running",
+    "service": "CyberOrion TikTok Downloader API",
+    "version": "4.0",
+    "method": "External API (No cookies needed)",
+    "platform": "Render.com",
+    "framework": "FastAPI",
+    "apis": {
+        "primary": "TikWM API",
+        "fallback": "SnapSave API"
+    },
+    "features": [
+        "No cookies required",
+        "HD video quality",
+        "Rate limiting",
+        "Auto-fallback",
+        "Video metadata"
+    ],
+    "endpoints": {
+        "/download": "POST - Download TikTok video",
+        "/health": "GET - Health check"
+    }
+})[:-1] + b',"timestamp":"'
+_ROOT_SUFFIX = b'"}'
+
+
 @app.get("/")
 async def root():
     """API information endpoint"""
-    return {
-        "status": "running",
-        "service": "CyberOrion TikTok Downloader API",
-        "version": "4.0",
-        "method": "External API (No cookies needed)",
-        "platform": "Render.com",
-        "framework": "FastAPI",
-        "apis": {
-            "primary": "TikWM API",
-            "fallback": "SnapSave API"
-        },
-        "features": [
-            "No cookies required",
-            "HD video quality",
-            "Rate limiting",
-            "Auto-fallback",
-            "Video metadata"
-        ],
-        "endpoints": {
-            "/download": "POST - Download TikTok video",
-            "/health": "GET - Health check"
-        },
-        "timestamp": datetime.now().isoformat()
-    }
+    return Response(
+        content=_ROOT_PREFIX + _cached_timestamp().encode() + _ROOT_SUFFIX,
+        media_type="application/json"
+    )
 
 @app.get("/health")
 async def health():
@@ -240,7 +487,7 @@ async def health():
         "method": "External API",
         "requires_cookies": False,
         "platform": "Render.com",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": _cached_timestamp()
     }
 
 @app.post("/download")
@@ -248,15 +495,15 @@ async def download_video(request: Request):
     """Download TikTok video using external APIs"""
     try:
         # Rate limiting
-        client_ip = request.client.host
-        rate_limiter.check_rate_limit(client_ip)
+        client_ip = get_client_ip(request)
+        await rate_limiter.check_rate_limit(client_ip)
         
         # Get request data
-        data = await request.json()
+        data = orjson.loads(await request.body())
         
         if not data or 'url' not in data:
-            logger.warning("⚠️ No URL provided")
-            return JSONResponse(
+            logger.warning("No URL provided")
+            return ORJSONResponse(
                 content={"success": False, "error": "No URL provided"},
                 status_code=400
             )
@@ -264,18 +511,17 @@ async def download_video(request: Request):
         tiktok_url = data['url']
         
         # Validate TikTok URL
-        valid_domains = ['tiktok.com', 'vm.tiktok.com', 'vt.tiktok.com']
-        if not any(domain in tiktok_url for domain in valid_domains):
-            logger.warning(f"⚠️ Invalid URL: {tiktok_url}")
-            return JSONResponse(
+        if not is_tiktok_url(tiktok_url):
+            logger.warning("Invalid URL: %s", tiktok_url)
+            return ORJSONResponse(
                 content={"success": False, "error": "Invalid TikTok URL"},
                 status_code=400
             )
         
         # Check for photo posts
         if '/photo/' in tiktok_url:
-            logger.info(f"⚠️ Photo post detected: {tiktok_url}")
-            return JSONResponse(
+            logger.debug("Photo post detected: %s", tiktok_url)
+            return ORJSONResponse(
                 content={
                     "success": False, 
                     "error": "TikTok photo posts (slideshows) are not supported. Please use a video post."
@@ -283,22 +529,15 @@ async def download_video(request: Request):
                 status_code=400
             )
         
-        logger.info(f"🎬 Processing: {tiktok_url}")
-        logger.info(f"📍 Client IP: {client_ip}")
-        
-        # Try TikWM API first
-        result = await download_with_tikwm(tiktok_url)
-        
-        # If TikWM fails, try SnapSave as fallback
-        if not result.get("success"):
-            logger.warning(f"⚠️ TikWM failed, trying SnapSave...")
-            result = await download_with_snapsave(tiktok_url)
+        logger.debug("Processing %s for client %s", tiktok_url, client_ip)
         
+        result = await resolve_video(tiktok_url)
+
         if result.get("success"):
-            logger.info(f"✅ Success via {result.get('api_source', 'Unknown')} API")
+            logger.debug("Success via %s API", result.get("api_source", "Unknown"))
             
             # Return response matching your Laravel controller's expected format
-            return JSONResponse(content={
+            return ORJSONResponse(content={
                 "success": True,
                 "download_url": result["download_url"],
                 "full_url": result["download_url"],  # Direct URL from API
@@ -306,7 +545,7 @@ async def download_video(request: Request):
                 "author": result.get("author", "Unknown"),
                 "caption": result.get("caption", "No caption available"),
                 "thumbnail": result.get("thumbnail", ""),
-                "filename": f"tiktok_video.mp4",
+                "filename": "tiktok_video.mp4",
                 "message": "Video ready for download",
                 "api_source": result.get("api_source", "External API"),
                 "stats": {
@@ -319,9 +558,9 @@ async def download_video(request: Request):
             })
         else:
             error_msg = result.get("error", "All download methods failed")
-            logger.error(f"❌ All APIs failed: {error_msg}")
+            logger.error("All APIs failed: %s", error_msg)
             
-            return JSONResponse(
+            return ORJSONResponse(
                 content={
                     "success": False,
                     "error": error_msg,
@@ -334,8 +573,8 @@ async def download_video(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Unexpected error: {str(e)}", exc_info=True)
-        return JSONResponse(
+        logger.error("Unexpected error: %s", e, exc_info=True)
+        return ORJSONResponse(
             content={
                 "success": False, 
                 "error": f"Server error: {str(e)}"
@@ -343,20 +582,73 @@ async def download_video(request: Request):
             status_code=500
         )
 
-@app.options("/download")
-async def download_options():
-    """Handle CORS preflight for download endpoint"""
-    return JSONResponse(
-        content={},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, OPTIONS",
-            "Access-Control-Allow-Headers": "*",
-        }
+@app.get("/download/stream")
+async def stream_video(request: Request, url: str):
+    """Relay the video through the server instead of exposing the upstream URL"""
+    client_ip = get_client_ip(request)
+    await rate_limiter.check_rate_limit(client_ip)
+
+    if not is_tiktok_url(url):
+        return ORJSONResponse(
+            content={"success": False, "error": "Invalid TikTok URL"},
+            status_code=400
+        )
+
+    result = await resolve_video(url)
+
+    if not result.get("success"):
+        return ORJSONResponse(
+            content={
+                "success": False,
+                "error": result.get("error", "All download methods failed")
+            },
+            status_code=503
+        )
+
+    # Open the upstream as a stream so the file is relayed chunk by chunk
+    # without buffering the whole MP4 in memory
+    try:
+        upstream = await client.send(
+            client.build_request("GET", result["download_url"]),
+            stream=True
+        )
+    except httpx.HTTPError as e:
+        logger.error("Upstream fetch failed: %s", e)
+        return ORJSONResponse(
+            content={"success": False, "error": f"Upstream fetch failed: {str(e)}"},
+            status_code=502
+        )
+
+    if upstream.status_code != 200:
+        await upstream.aclose()
+        return ORJSONResponse(
+            content={"success": False, "error": f"Upstream returned {upstream.status_code}"},
+            status_code=502
+        )
+
+    headers = {"Content-Disposition": 'attachment; filename="tiktok_video.mp4"'}
+    content_length = upstream.headers.get("content-length")
+    if content_length:
+        headers["Content-Length"] = content_length
+
+    return StreamingResponse(
+        upstream.aiter_bytes(chunk_size=65536),
+        media_type="video/mp4",
+        headers=headers,
+        background=BackgroundTask(upstream.aclose)
     )
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    logger.info(f"🚀 Starting server on port {port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    logger.info("Starting server on port %s", port)
+    # Note: rate limiter and resolution cache are per-process, so with N
+    # workers the effective rate limit is N times the configured value
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 2))
+    )